@@ -10,10 +10,11 @@ designed to be copied and run without modification once you've configured
 How it works:
 
 1. Throughout the day, your alert automation (for example, the Playwright
-   scanner) should append each alert event to a JSON file called
-   ``alerts_log.json``.  Each entry in the file should be a dictionary with
-   at least the keys ``ticker`` and ``ts`` (timestamp), and optionally
-   ``signal`` or any other context.
+   scanner) should append each alert event to ``alerts_log.json`` as one
+   JSON object per line (NDJSON; see ``append_alert``).  Each entry should
+   be a dictionary with at least the keys ``ticker`` and ``ts`` (timestamp),
+   and optionally ``signal`` or any other context.  A legacy file holding a
+   single JSON array is still accepted.
 2. At the end of the trading day, run this script.  It will:
    - Read all events for the current date from ``alerts_log.json``.
    - Aggregate the number of alerts per ticker.
@@ -59,6 +60,7 @@ from datetime import datetime, timezone
 from typing import Dict, List
 
 import requests
+from requests.adapters import HTTPAdapter
 
 
 # ----- Configuration -------------------------------------------------------
@@ -66,11 +68,16 @@ import requests
 # Public relay URL (include the /tv path)
 RELAY_URL = "https://your-ngrok-url.ngrok-free.app/tv"  # <-- Replace with your relay URL
 
-# Path to the alert log file (JSON array of alert events)
+# Path to the alert log file (NDJSON, one alert event per line)
 ALERT_LOG = "alerts_log.json"
 
 # --------------------------------------------------------------------------
 
+# One pooled session for BloFin and relay calls: keep-alive skips a TCP+TLS
+# handshake on every request after the first.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
+
 
 def load_alerts(log_path: str) -> List[Dict]:
     """
@@ -104,6 +111,88 @@ def load_alerts(log_path: str) -> List[Dict]:
         return []
 
 
+def append_alert(event: Dict, log_path: str = ALERT_LOG) -> None:
+    """
+    Append one alert event to the NDJSON log.
+
+    Appending a line keeps writes O(1) and lets ``load_alerts_today`` read
+    the file backwards, stopping at the first event from an earlier day.
+
+    Parameters
+    ----------
+    event : Dict
+        Alert event; should carry ``ticker`` and ``ts``.
+    log_path : str
+        Path to the alert log file.
+    """
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(event, separators=(",", ":")) + "\n")
+
+
+def _iter_lines_reversed(f, block_size: int = 64 * 1024):
+    """Yield the non-empty lines of a binary file, last line first."""
+    f.seek(0, os.SEEK_END)
+    pos = f.tell()
+    tail = b""
+    while pos > 0:
+        step = min(block_size, pos)
+        pos -= step
+        f.seek(pos)
+        lines = (f.read(step) + tail).split(b"\n")
+        tail = lines[0]  # may be the second half of a line from the previous block
+        for line in reversed(lines[1:]):
+            if line.strip():
+                yield line
+    if tail.strip():
+        yield tail
+
+
+def load_alerts_today(log_path: str) -> List[Dict]:
+    """
+    Load today's (UTC) alert events from the log.
+
+    The NDJSON log is read backwards in 64 KiB blocks and reading stops at
+    the first event dated before today, so the cost is proportional to
+    today's alerts rather than the whole history.  A legacy JSON-array log
+    falls back to ``load_alerts`` + ``filter_today``.
+
+    Parameters
+    ----------
+    log_path : str
+        Path to the alert log file.
+
+    Returns
+    -------
+    List[Dict]
+        Today's alerts in file order.  Returns an empty list if the file
+        does not exist or is empty.
+    """
+    if not os.path.exists(log_path):
+        return []
+    today = datetime.now(timezone.utc).date()
+    out: List[Dict] = []
+    try:
+        with open(log_path, "rb") as f:
+            if f.read(64).lstrip().startswith(b"["):
+                return filter_today(load_alerts(log_path))
+            for line in _iter_lines_reversed(f):
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue  # torn or hand-edited line
+                if not isinstance(event, dict):
+                    continue
+                day = parse_timestamp(event.get("ts")).date()
+                if day < today:
+                    break  # appended in time order: everything earlier is older
+                if day == today:
+                    out.append(event)
+    except OSError:
+        return []
+    out.reverse()
+    return out
+
+
 def parse_timestamp(ts) -> datetime:
     """
     Convert a timestamp (ISO string or Unix milliseconds) to a datetime object.
@@ -166,7 +255,7 @@ def fetch_blofin_price(inst_id: str) -> Dict[str, str]:
         and ``open24h``.  If the request fails, returns an empty dict.
     """
     try:
-        resp = requests.get(
+        resp = _session.get(
             "https://openapi.blofin.com/api/v1/market/tickers",
             params={"instId": inst_id},
             timeout=10,
@@ -183,6 +272,40 @@ def fetch_blofin_price(inst_id: str) -> Dict[str, str]:
     return {}
 
 
+def fetch_blofin_tickers() -> Dict[str, Dict[str, str]]:
+    """
+    Fetch every instrument's ticker from BloFin in a single request.
+
+    ``/market/tickers`` without ``instId`` returns all instruments, so one
+    round trip covers every ticker in the summary.
+
+    Returns
+    -------
+    Dict[str, Dict[str, str]]
+        ``instId`` -> dict with ``last``, ``high24h`` and ``open24h``.  Empty
+        if the request fails.
+    """
+    try:
+        resp = _session.get(
+            "https://openapi.blofin.com/api/v1/market/tickers",
+            timeout=10,
+        )
+        data = resp.json().get("data")
+        if data and isinstance(data, list):
+            return {
+                row.get("instId"): {
+                    "last": row.get("last"),
+                    "high24h": row.get("high24h"),
+                    "open24h": row.get("open24h"),
+                }
+                for row in data
+                if isinstance(row, dict)
+            }
+    except Exception:
+        pass
+    return {}
+
+
 def build_summary(alerts_today: List[Dict]) -> str:
     """
     Build a textual summary of today's alerts and price movements.
@@ -219,10 +342,12 @@ def build_summary(alerts_today: List[Dict]) -> str:
     # For each ticker, fetch current and 24h price data
     if counts:
         lines.append("24‑hour price snapshot:")
+        # One bulk request; per-ticker calls only if it fails
+        tickers = fetch_blofin_tickers()
         for ticker in counts.keys():
             # Convert symbol from format like "BTCUSDT" or "BTC-USDT" to BloFin instId
             inst_id = ticker.replace("", "").replace("_", "-")
-            price_data = fetch_blofin_price(inst_id)
+            price_data = tickers.get(inst_id) if tickers else fetch_blofin_price(inst_id)
             if price_data:
                 last = price_data.get("last")
                 high = price_data.get("high24h")
@@ -258,7 +383,7 @@ def send_summary_to_relay(summary: str) -> None:
         "ts": datetime.now(timezone.utc).isoformat(),
     }
     try:
-        resp = requests.post(RELAY_URL, json=payload, timeout=10)
+        resp = _session.post(RELAY_URL, json=payload, timeout=10)
         resp.raise_for_status()
         print(f"Summary sent to relay: status {resp.status_code}")
     except Exception as exc:
@@ -269,8 +394,7 @@ def main() -> None:
     """
     Main entry point for the daily wrap‑up script.
     """
-    alerts = load_alerts(ALERT_LOG)
-    alerts_today = filter_today(alerts)
+    alerts_today = load_alerts_today(ALERT_LOG)
     summary = build_summary(alerts_today)
     print(summary)
     send_summary_to_relay(summary)
@@ -28,44 +28,129 @@ for production use.
 
 import json
 import os
+import queue
+import threading
+import time
 from datetime import datetime, timezone
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
+import orjson
 import requests
-from collections import defaultdict
+from requests.adapters import HTTPAdapter
+from collections import defaultdict, deque
 
 app = Flask(__name__)
 
 # Retrieve ChatGPT destination from environment.
 CHATGPT_WEBHOOK_URL = os.environ.get("CHATGPT_WEBHOOK_URL", "http://localhost:9999/ingest")
 
+# One session for this server's outbound calls: BloFin tickers from
+# /daily-summary and the forwarder's posts to CHATGPT_WEBHOOK_URL.  Keep-alive
+# reuses the connection after the first request.  The larger pool only covers
+# https:// (BloFin); the webhook, http://localhost by default, uses the
+# Session's stock adapter, which is plenty for the single forwarder thread.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
+
 # In-memory log of today's alerts. Each element is a dict containing at least
 # 'ticker' and 'ts'. This will be appended to every time /tv receives a
-# webhook. It resets when a new UTC day starts.
-alert_log = []
+# webhook. It resets when a new UTC day starts.  Bounded so a spiky alert
+# stream cannot balloon memory; per-ticker counts are kept live alongside it
+# (and stay exact past the cap) so /daily-summary never rescans the log.
+alert_log = deque(maxlen=50_000)
+alert_counts = defaultdict(int)
 last_log_date = None
 
+
+def _loads(raw):
+    """orjson parse; stdlib fallback for Pine's bare NaN (str.tostring(na))."""
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return json.loads(raw)
+
+
+def _json(obj) -> Response:
+    """jsonify() equivalent serialized with orjson."""
+    return Response(orjson.dumps(obj), mimetype="application/json")
+
+
 def reset_alert_log_if_new_day() -> None:
     """
     Check if the current UTC date differs from the date of the last logged
-    alert. If it does, clear the in-memory alert log.
+    alert. If it does, clear the in-memory alert log and counts.
     """
-    global last_log_date, alert_log
+    global last_log_date
     current_date = datetime.now(timezone.utc).date()
     if last_log_date is None or current_date != last_log_date:
-        alert_log = []
+        alert_log.clear()
+        alert_counts.clear()
         last_log_date = current_date
 
 
 def forward_to_chatgpt(payload: dict):
     """Send the alert payload to ChatGPT or a Discord bot via webhook."""
     try:
-        resp = requests.post(CHATGPT_WEBHOOK_URL, json=payload, timeout=10)
+        resp = _session.post(
+            CHATGPT_WEBHOOK_URL,
+            data=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"},
+            timeout=10,
+        )
         resp.raise_for_status()
     except Exception as e:
         print(f"Error forwarding alert: {e}")
 
 
+# /tv hands alerts to a forwarder thread so the webhook is acknowledged
+# without waiting on the downstream round trip.  Bounded so a dead endpoint
+# cannot grow memory; overflow is dropped and logged.
+_forward_q = queue.Queue(maxsize=1000)
+
+
+def _forwarder_loop() -> None:
+    while True:
+        forward_to_chatgpt(_forward_q.get())
+
+
+def queue_forward(payload: dict) -> None:
+    try:
+        _forward_q.put_nowait(payload)
+    except queue.Full:
+        print("Forward queue full; dropping alert.")
+
+
+threading.Thread(target=_forwarder_loop, daemon=True).start()
+
+
+# Last bulk ticker snapshot as (fetched_at_monotonic, {instId: row}).  One
+# entry covers every instrument, so a burst of /daily-summary calls inside
+# the TTL makes no upstream requests at all.
+TICKERS_TTL_SEC = 30.0
+_tickers_cache = (0.0, {})
+
+
+def fetch_blofin_tickers() -> dict:
+    """All BloFin tickers in one request (no instId), keyed by instId; {} on failure."""
+    global _tickers_cache
+    fetched_at, tickers = _tickers_cache
+    if tickers and time.monotonic() - fetched_at < TICKERS_TTL_SEC:
+        return tickers
+    try:
+        resp = _session.get(
+            "https://openapi.blofin.com/api/v1/market/tickers",
+            timeout=10,
+        )
+        data = resp.json().get("data")
+        if data and isinstance(data, list):
+            tickers = {row.get("instId"): row for row in data if isinstance(row, dict)}
+            _tickers_cache = (time.monotonic(), tickers)
+            return tickers
+    except Exception as e:
+        print(f"Error fetching tickers: {e}")
+    return {}
+
+
 @app.route("/tv", methods=["POST"])
 def tradingview_webhook():
     """
@@ -73,39 +158,47 @@ def tradingview_webhook():
     alert message (the result of Pine's alert() call) and may include a chart
     snapshot URL in the top‑level JSON body under `image` or `image_url`.
     """
-    # TradingView sends a plain text body by default.  Attempt to parse as JSON.
-    body = request.data.decode('utf-8', errors='ignore')
+    # TradingView sends a plain text body by default.  Parse the raw bytes once;
+    # a JSON envelope is only re-parsed for the string under "message".
+    raw = request.get_data()
     snapshot_url = None
-    # Some versions of TradingView include an `image` field containing a URL.
-    try:
-        tv_payload = request.get_json(force=False, silent=True)
-        if tv_payload and isinstance(tv_payload, dict):
-            snapshot_url = tv_payload.get("image") or tv_payload.get("image_url")
-            # The message itself may be under the "message" key if provided.
-            body = tv_payload.get("message", body)
-    except Exception:
-        pass
-    # Clean up the JSON string (payload) from the Pine alert.
     try:
-        alert_data = json.loads(body)
-    except json.JSONDecodeError:
+        alert_data = _loads(raw)
+    except ValueError:
+        alert_data = None
+    # Some versions of TradingView include an `image` field containing a URL.
+    if request.is_json and isinstance(alert_data, dict):
+        snapshot_url = alert_data.get("image") or alert_data.get("image_url")
+        # The message itself may be under the "message" key if provided.
+        if "message" in alert_data:
+            message = alert_data["message"]
+            try:
+                alert_data = _loads(message)
+            except (ValueError, TypeError):
+                alert_data = None
+            if not isinstance(alert_data, dict):
+                alert_data = {"raw": str(message).strip()}
+    if not isinstance(alert_data, dict):
         # If parsing fails, wrap in a dict with raw body.
-        alert_data = {"raw": body.strip()}
+        alert_data = {"raw": raw.decode("utf-8", errors="ignore").strip()}
     # Append snapshot URL and timestamp.
     alert_data["snapshot_url"] = snapshot_url
     alert_data["ts"] = datetime.now(timezone.utc).isoformat()
-    # Forward to ChatGPT/Discord.
-    forward_to_chatgpt(alert_data)
+    # Forward to ChatGPT/Discord (in the background).
+    queue_forward(alert_data)
 
     # Log the alert for daily summary
     reset_alert_log_if_new_day()
     # Record only basic info to avoid storing large payloads
+    ticker = alert_data.get("ticker")
     alert_log.append({
-        "ticker": alert_data.get("ticker"),
+        "ticker": ticker,
         "signal": alert_data.get("signal"),
         "ts": alert_data["ts"],
     })
-    return jsonify({"status": "ok"})
+    if ticker:
+        alert_counts[ticker] += 1
+    return _json({"status": "ok"})
 
 
 @app.route("/scan-now", methods=["POST"])
@@ -118,7 +211,7 @@ def scan_now():
     # In practice, you could enqueue a job or emit a message to your
     # automation worker here.  For demonstration we simply log the request.
     print("Received on‑demand scan request.")
-    return jsonify({"status": "scan scheduled"})
+    return _json({"status": "scan scheduled"})
 
 
 @app.route("/daily-summary", methods=["GET"])
@@ -131,12 +224,8 @@ def daily_summary():
     """
     # Reset the log if the date has changed
     reset_alert_log_if_new_day()
-    # Aggregate counts per ticker
-    counts = defaultdict(int)
-    for entry in alert_log:
-        ticker = entry.get("ticker")
-        if ticker:
-            counts[ticker] += 1
+    # Per-ticker counts are maintained by /tv; copy so iteration is stable
+    counts = dict(alert_counts)
     lines = []
     lines.append(f"Daily wrap-up for {datetime.now(timezone.utc).date()}")
     lines.append("")
@@ -149,35 +238,29 @@ def daily_summary():
             lines.append(f"• {ticker}: {count} alert{plural}")
         lines.append("")
         lines.append("24-hour price snapshot:")
+        # One request for every instrument instead of one per ticker
+        tickers = fetch_blofin_tickers()
         for ticker in counts.keys():
             # Convert ticker to BloFin instrument ID (e.g. BTCUSDT -> BTC-USDT)
             inst_id = ticker.replace("_", "-")
-            try:
-                resp = requests.get(
-                    "https://openapi.blofin.com/api/v1/market/tickers",
-                    params={"instId": inst_id},
-                    timeout=10,
+            row = tickers.get(inst_id)
+            if row:
+                last = row.get("last")
+                high24h = row.get("high24h")
+                open24h = row.get("open24h")
+                pct_change = None
+                try:
+                    pct_change = (float(last) - float(open24h)) / float(open24h) * 100
+                except Exception:
+                    pass
+                change_str = f"({pct_change:+.2f}% over 24h)" if pct_change is not None else ""
+                lines.append(
+                    f"• {ticker}: last {last}, high {high24h}, open {open24h} {change_str}"
                 )
-                data = resp.json().get("data")
-                if data and isinstance(data, list):
-                    last = data[0].get("last")
-                    high24h = data[0].get("high24h")
-                    open24h = data[0].get("open24h")
-                    pct_change = None
-                    try:
-                        pct_change = (float(last) - float(open24h)) / float(open24h) * 100
-                    except Exception:
-                        pass
-                    change_str = f"({pct_change:+.2f}% over 24h)" if pct_change is not None else ""
-                    lines.append(
-                        f"• {ticker}: last {last}, high {high24h}, open {open24h} {change_str}"
-                    )
-                else:
-                    lines.append(f"• {ticker}: price data unavailable")
-            except Exception:
+            else:
                 lines.append(f"• {ticker}: price data unavailable")
     summary_text = "\n".join(lines)
-    return jsonify({"summary": summary_text})
+    return _json({"summary": summary_text})
 
 
 if __name__ == "__main__":
@@ -5,14 +5,16 @@
 # - Adds /tv/symbol to fetch state for a single symbol
 # - Single worker; no static HTML files named port*.html in repo.
 
-import os, time, json, html, datetime, threading
+import os, sys, io, csv, time, json, html, bisect, hashlib, datetime, threading
+from functools import lru_cache
 from typing import Dict, Any, Optional, List, Set
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse, HTMLResponse, PlainTextResponse
+import orjson
+from fastapi.responses import ORJSONResponse, HTMLResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 # ---------- Utils ----------
-def now_ms() -> int: return int(time.time() * 1000)
+def now_ms() -> int: return time.time_ns() // 1_000_000
 def _strip(s: str) -> str:
     """Normalize a string by stripping whitespace and surrounding quotes."""
     s = (s or "").strip()
@@ -22,26 +24,32 @@ def _strip(s: str) -> str:
 
 def _upper(s: Optional[str]) -> str: return (s or "").strip().upper()
 
+def _loads(raw: Any) -> Any:
+    """orjson parse; stdlib fallback for Pine's bare NaN (str.tostring(na))."""
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return json.loads(raw)
+
 def _split_env_list(key: str) -> List[str]:
     raw = os.getenv(key, "") or ""
     if not raw: return []
     # support commas and whitespace
     return [ _upper(t) for t in raw.split(",") if _upper(t) ]
 
-def _norm_variants(sym: str) -> Set[str]:
+@lru_cache(maxsize=4096)  # symbol space is small; /tv/symbol input is client-controlled
+def _norm_variants(sym: str) -> frozenset:
     out: Set[str] = set()
     s = _upper(sym); out.add(s)
     core = s.split(":", 1)[1] if ":" in s else s; out.add(core)
     if "/" in core: out.add(core.replace("/", ""))
-    else:
-        if core.endswith("USDT.P") and "/" not in core:
-            base = core[:-6]; out.add(f"{base}/USDT.P")
-    return out
+    elif core.endswith("USDT.P"): out.add(core[:-6] + "/USDT.P")
+    return frozenset(out)  # not interned: /tv/symbol input is client-controlled
 
-def _make_selector(name: str) -> Set[str]:
+def _make_selector(tokens: List[str]) -> frozenset:
     out: Set[str] = set()
-    for t in _split_env_list(name): out |= _norm_variants(t)
-    return out
+    for t in tokens: out |= _norm_variants(t)
+    return frozenset(out)
 
 # ---------- Config ----------
 AUTH_SHARED_SECRET = _strip(os.getenv("AUTH_SHARED_SECRET",""))
@@ -49,52 +57,119 @@ FRESH_CUTOFF_SECS  = int(os.getenv("FRESH_CUTOFF_SECS", "5400"))  # TV freshness
 BLOFIN_TTL_SEC     = int(os.getenv("BLOFIN_TTL_SEC", "240"))       # Port freshness (4m)
 BLOFIN_LATEST_PATH = _strip(os.getenv("BLOFIN_LATEST_PATH", "/tmp/blofin_latest.json"))
 TV_LATEST_CACHE_PATH = _strip(os.getenv("TV_LATEST_CACHE_PATH", "/tmp/tv_latest.json"))
+SNAP_CACHE_TTL_MS  = int(os.getenv("SNAP_CACHE_TTL_MS", "1000"))     # /snap* memo window (bot polling)
+WWASD_FSYNC        = os.getenv("WWASD_FSYNC", "0") == "1"            # fsync caches before rename (loss = cold start)
+TV_MAX_BODY_BYTES  = int(os.getenv("TV_MAX_BODY_BYTES", str(1 << 20)))  # JSON/text /tv bodies; 413 above (not multipart)
 
 
 GREEN_LIST = _split_env_list("GREEN_LIST")
 MACRO_LIST = _split_env_list("MACRO_LIST")
 FULL_LIST  = _split_env_list("FULL_LIST")
-SEL_GREEN, SEL_MACRO, SEL_FULL = _make_selector("GREEN_LIST"), _make_selector("MACRO_LIST"), _make_selector("FULL_LIST")
+SEL_GREEN, SEL_MACRO, SEL_FULL = _make_selector(GREEN_LIST), _make_selector(MACRO_LIST), _make_selector(FULL_LIST)
+# Interned list names; query-parsed names go through _list_name so selector
+# lookups hit the identity fast path. Unknown names collate against FULL.
+LIST_GREEN, LIST_MACRO, LIST_FULL = sys.intern("green"), sys.intern("macro"), sys.intern("full")
+_SELECTORS = {LIST_GREEN: SEL_GREEN, LIST_MACRO: SEL_MACRO, LIST_FULL: SEL_FULL}
 
 # ---------- App ----------
-app = FastAPI(title="wwasd-relay")
+app = FastAPI(title="wwasd-relay", default_response_class=ORJSONResponse)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=False, allow_methods=["GET","POST"], allow_headers=["*"])
 
+class _HealthShortCircuit:
+    """Answer GET/HEAD /health (the most-polled route) ahead of CORS and routing.
+    Same body as the /health route; preflights still go through CORSMiddleware."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != "/health" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+        body = _health_body()
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", b"%d" % len(body)),
+            (b"access-control-allow-origin", b"*"),  # what CORSMiddleware would add
+        ]})
+        await send({"type": "http.response.body", "body": body if scope["method"] == "GET" else b""})
+
+app.add_middleware(_HealthShortCircuit)  # added last = outermost
+
 # ---------- In-memory stores ----------
+# TV stores are lock-free by design: every write happens on the event loop
+# (async ingest, in order: _tv_latest -> _tv_index -> _tv_version), and the
+# threadpool readers only iterate the sorted symbol lists, which are swapped, never
+# mutated. Sharding/striped locks would buy nothing under one worker + GIL.
 _tv_latest: Dict[str, Dict[str, Any]] = {}    # symbol -> last WWASD_STATE (with server_received_ms)
+_tv_version: int = 0                          # bumped on every WWASD_STATE ingest
+_snap_cache: Dict[tuple, tuple] = {}          # (list names, fresh_only, max_age_secs) -> (built_ms, tv_version, payload, rendered)
+_tv_sorted_syms: List[str] = []               # _tv_latest keys in order; replaced (never mutated) on insert
+_tv_list_syms: Dict[str, List[str]] = {LIST_GREEN: [], LIST_MACRO: [], LIST_FULL: []}  # per-list, same rules
+_tv_sym_html: Dict[str, str] = {}             # symbol -> html-escaped form for the SSR pages
 
-_blofin_latest: Optional[Dict[str, Any]] = None
-_blofin_last_ms: int = 0
-_blofin_lock = threading.Lock()
+# Port state is one (body, server_received_ms) tuple, rebound whole on ingest, so
+# readers unpack a consistent pair without a lock.
+_blofin_state: tuple = (None, 0)
 
 def _fresh_ms(ts_ms: Optional[int], max_age_secs: int) -> bool:
     if not ts_ms: return False
     return (now_ms() - int(ts_ms)) <= (max_age_secs * 1000)
 
 # ---------- Port disk hardening ----------
+def _write_atomic(path: str, blob: bytes) -> None:
+    """tmp file + rename; raw fd write, no text/buffer layers."""
+    tmp = path + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        view = memoryview(blob)
+        while view: view = view[os.write(fd, view):]
+        if WWASD_FSYNC: os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)  # atomic on Linux/Windows
+
 def _blofin_write_atomic(obj: Dict[str, Any]) -> None:
     try:
-        tmp = BLOFIN_LATEST_PATH + ".tmp"
-        with open(tmp, "w", encoding="utf-8") as f:
-            json.dump(obj, f, separators=(",", ":"), ensure_ascii=False)
-        os.replace(tmp, BLOFIN_LATEST_PATH)  # atomic on Linux/Windows
+        _write_atomic(BLOFIN_LATEST_PATH, orjson.dumps(obj))
     except Exception:
         pass  # in-memory still good
 
 def _blofin_load_last() -> Optional[Dict[str, Any]]:
     try:
-        with open(BLOFIN_LATEST_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(BLOFIN_LATEST_PATH, "rb") as f:
+            return _loads(f.read())
     except Exception:
         return None
 
 # preload last-good so /blofin/latest never starts empty after a restart
-_blofin_latest = _blofin_load_last()
+_blofin_state = (_blofin_load_last(), 0)
+
+# Disk backup runs on a writer thread (serialize + rename off the request path).
+# Ingest only flags it dirty; the writer snapshots whatever _blofin_state points
+# at, so a burst of pushes collapses to one write of the newest payload.
+_blofin_dirty = threading.Event()
+
+def _blofin_writer_loop():
+    while True:
+        _blofin_dirty.wait()
+        _blofin_dirty.clear()  # clear before reading so a racing push re-arms it
+        latest = _blofin_state[0]
+        if latest: _blofin_write_atomic(latest)
+
+try:
+    _blofin_writer_started  # type: ignore[name-defined]
+except NameError:
+    _blofin_writer_started = True
+    threading.Thread(target=_blofin_writer_loop, daemon=True).start()
 
 # ---------- Security ----------
-def _require_token(req: Request) -> None:
+def _request_token(req: Request) -> Optional[str]:
+    return req.query_params.get("token") or req.headers.get("X-WWASD-Token")
+
+def _require_token(req: Request, body: Any = None) -> None:
+    """?token= / X-WWASD-Token, else "token" in the already-parsed body (popped so it is never stored)."""
+    body_token = body.pop("token", None) if isinstance(body, dict) else None
     if not AUTH_SHARED_SECRET: return
-    token = req.query_params.get("token") or req.headers.get("X-WWASD-Token")
+    token = _request_token(req) or body_token
     if token != AUTH_SHARED_SECRET:
         raise HTTPException(status_code=403, detail="forbidden")
 
@@ -105,23 +180,56 @@ def _extract_positions(any_payload: Dict[str, Any]) -> List[Dict[str, Any]]:
       {"data":{"code":"0","data":[...]}}  (Blofin REST)
       {"data":[...]} or {"positions":[...]} or {"payload":{...}}
     """
-    if not any_payload: return []
-    data = any_payload.get("data", any_payload)
-    if isinstance(data, dict) and "data" in data: data = data["data"]
-    if isinstance(data, dict) and "positions" in data: data = data["positions"]
-    if isinstance(data, list): return data
+    # iterative + `type() is`: bodies come from orjson, so only plain dict/list
+    p = any_payload
+    for _ in range(4):  # bounded {"payload": {...}} unwrapping
+        if type(p) is not dict: return []
+        data = p.get("data", p)
+        if type(data) is list: return data
+        if type(data) is dict:
+            inner = data.get("data", data)
+            if type(inner) is list: return inner  # Blofin REST, the common shape
+            if type(inner) is dict:
+                pos = inner.get("positions")
+                if type(pos) is list: return pos
+        p = p.get("payload")
     return []
 
-def _in_named_list(sym: str, name: str) -> bool:
-    sset = SEL_GREEN if name == "green" else SEL_MACRO if name == "macro" else SEL_FULL
-    if not sset: return True
-    norm = _norm_variants(sym)
-    return any(n in sset for n in norm)
+def _list_name(s: str) -> str: return _strip(s).lower()
+
+@lru_cache(maxsize=32)  # clients poll with a handful of fixed ?lists= values
+def _parse_lists(lists: str) -> tuple:
+    return tuple(_list_name(x) for x in lists.split(",") if _strip(x)) or (LIST_GREEN,)
+
+def _insorted(syms: List[str], sym: str) -> List[str]:
+    out = syms.copy(); bisect.insort(out, sym)
+    return out
+
+def _tv_index(sym: str) -> None:
+    """Index a newly seen symbol (cold path): sorted position overall and per list."""
+    global _tv_sorted_syms
+    if sym in _tv_sym_html: return
+    _tv_sym_html[sym] = html.escape(sym)
+    # readers iterate whichever list they grabbed, so swap rather than insort in place
+    variants = _norm_variants(sym)  # once per symbol, never on the read path
+    for name, sset in _SELECTORS.items():
+        if not sset or not sset.isdisjoint(variants): _tv_list_syms[name] = _insorted(_tv_list_syms[name], sym)
+    _tv_sorted_syms = _insorted(_tv_sorted_syms, sym)
+
+def _sym_html(sym: str) -> str:
+    # items keep the sender's casing; only the indexed (upper) form is precomputed
+    return _tv_sym_html.get(sym) or html.escape(sym)
 
 def _dict(item: Dict[str, Any]) -> Dict[str, Any]:
     """Shallow-copy dict (don’t leak internal refs)."""
     return dict(item or {})
 
+_NO_STORE = {"Cache-Control": "no-store"}  # Response copies headers into its own list
+
+def _json_response(obj: Any) -> Response:
+    """orjson bytes straight into a Response (no jsonable_encoder, no option flags)."""
+    return Response(orjson.dumps(obj), media_type="application/json", headers=_NO_STORE)
+
 # ---------- Home ----------
 @app.get("/")
 def home():
@@ -137,68 +245,104 @@ def home():
         "GET  /health         (ok,tv_count,port_cached)\n"
     )
 
-@app.get("/health")
+_HEALTH_TMPL = b'{"ok":true,"time":%d,"tv_count":%d,"port_cached":%s}'
+
+def _health_body() -> bytes:
+    return _HEALTH_TMPL % (int(time.time()), len(_tv_latest), b"true" if _blofin_state[0] else b"false")
+
+@app.get("/health", response_class=ORJSONResponse)
 def health():
-    return {"ok": True, "time": int(time.time()), "tv_count": len(_tv_latest), "port_cached": bool(_blofin_latest)}
+    # normally answered by _HealthShortCircuit; kept for the schema and as a fallback
+    return Response(_health_body(), media_type="application/json")
 
 # ---------- Ingest ----------
+async def _read_capped(request: Request) -> bytes:
+    """Collect the body chunk by chunk; 413 as soon as it passes TV_MAX_BODY_BYTES."""
+    if int(request.headers.get("content-length") or 0) > TV_MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail="payload too large")
+    chunks: List[bytes] = []; total = 0
+    async for chunk in request.stream():
+        total += len(chunk)
+        if total > TV_MAX_BODY_BYTES:  # chunked / lying content-length
+            raise HTTPException(status_code=413, detail="payload too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
 @app.post("/tv")
 async def ingest_tv(request: Request):
-    _require_token(request)
-    # accept JSON or form payload
+    # accept JSON (TradingView posts it as text/plain too) or form payload;
+    # the body is read and parsed exactly once
+    ctype = request.headers.get("content-type","")
+    is_form = ctype.startswith(("multipart/", "application/x-www-form-urlencoded"))
+    # Forms are not size-capped, so they need the query/header token up front;
+    # the body-token fallback only exists on the capped path below.
+    if AUTH_SHARED_SECRET and (is_form or _request_token(request)):
+        _require_token(request)
     try:
-        ctype = request.headers.get("content-type","")
-        if "application/json" in ctype:
-            body = await request.json()
+        if is_form:
+            form = await request.form()
+            payload = form.get("message") or form.get("payload") or ""
+            body = _loads(payload) if payload else {}
         else:
-            try:
-                form = await request.form()
-                payload = form.get("message") or form.get("payload") or ""
-                body = json.loads(payload) if payload else {}
-            except Exception:
-                raw = await request.body()
-                body = json.loads(raw.decode("utf-8")) if raw else {}
+            raw = await _read_capped(request)
+            if "application/json" in ctype or raw.lstrip()[:1] in (b"{", b"["):
+                body = _loads(raw)
+            else:
+                body = {}  # non-JSON text alert: nothing to store
+    except HTTPException:
+        raise
     except Exception as e:
+        _require_token(request)  # no token (or only one in the body we could not parse): 403, not parser detail
         raise HTTPException(status_code=400, detail=f"invalid payload: {e}")
+    _require_token(request, body)
 
-    typ = _upper(body.get("type",""))
+    try:
+        typ = _upper(body["type"])
+    except KeyError:
+        typ = ""
+    except (TypeError, AttributeError):  # non-object JSON or non-string type
+        raise HTTPException(status_code=400, detail="invalid payload: expected object with string type")
     now = now_ms()
     body["server_received_ms"] = now
 
     if typ == "WWASD_STATE":
-        sym = _upper(body.get("symbol",""))
+        sym = sys.intern(_upper(body.get("symbol","")))  # one key object across the stores/indexes
         if not sym: raise HTTPException(status_code=400, detail="missing symbol")
+        global _tv_version
         _tv_latest[sym] = body
-        return JSONResponse({"ok": True, "stored": sym}, headers={"Cache-Control": "no-store"})
+        _tv_index(sym)
+        _tv_version += 1
+        _tv_dirty.set()
+        return _json_response({"ok": True, "stored": sym})
 
     if typ == "BLOFIN_POSITIONS":
-        global _blofin_latest, _blofin_last_ms
-        with _blofin_lock:
-            _blofin_latest = body
-            _blofin_last_ms = now
-            _blofin_write_atomic(body)
-        return JSONResponse({"ok": True, "stored": "blofin_positions"}, headers={"Cache-Control": "no-store"})
+        global _blofin_state
+        _blofin_state = (body, now)
+        _blofin_dirty.set()
+        return _json_response({"ok": True, "stored": "blofin_positions"})
 
-    return JSONResponse({"ok": True, "ignored": True}, headers={"Cache-Control": "no-store"})
+    return _json_response({"ok": True, "ignored": True})
 
 # ---------- TV read endpoints ----------
 def _tv_collect(list_name: Optional[str], fresh_only: int, max_age_secs: int) -> Dict[str, Any]:
     items: List[Dict[str, Any]] = []
-    for sym, item in _tv_latest.items():
-        if list_name and not _in_named_list(sym, list_name): continue
-        out = dict(item)
-        ts = out.get("server_received_ms") or out.get("ts")
-        out["is_fresh"] = _fresh_ms(ts, max_age_secs)
-        items.append(out)
-    items.sort(key=lambda x: x.get("symbol",""))
-    if fresh_only: items = [it for it in items if it.get("is_fresh")]
+    if list_name: syms = _tv_list_syms[list_name if list_name in _SELECTORS else LIST_FULL]
+    else: syms = _tv_sorted_syms
+    cutoff = now_ms() - max_age_secs * 1000  # one clock read per collation, not per symbol
+    for sym in syms:
+        item = _tv_latest[sym]
+        ts = item.get("server_received_ms") or item.get("ts")
+        fresh = bool(ts) and int(ts) >= cutoff
+        if fresh_only and not fresh: continue  # stale rows are never copied
+        # the copy is what keeps is_fresh out of the stored state
+        items.append({**item, "is_fresh": fresh})
     return {"count": len(items), "items": items}
 
 @app.get("/tv/latest")
 def tv_latest(list: str = "", fresh_only: int = 0, max_age_secs: int = FRESH_CUTOFF_SECS):
-    name = (list or "").strip().lower()
+    name = _list_name(list)
     payload = _tv_collect(name or None, fresh_only, max_age_secs)
-    return JSONResponse(payload, headers={"Cache-Control": "no-store"})
+    return _json_response(payload)
 
 @app.get("/tv/symbol/{symbol}")
 def tv_symbol(symbol: str, max_age_secs: int = FRESH_CUTOFF_SECS):
@@ -215,43 +359,78 @@ def tv_symbol(symbol: str, max_age_secs: int = FRESH_CUTOFF_SECS):
     out = dict(item)
     ts = out.get("server_received_ms") or out.get("ts")
     out["is_fresh"] = _fresh_ms(ts, max_age_secs)
-    return JSONResponse(out, headers={"Cache-Control": "no-store"})
-
-@app.get("/snap")
-def snap(lists: str = "green,macro,full", fresh_only: int = 1, max_age_secs: int = FRESH_CUTOFF_SECS):
-    wanted = [ _strip(x).lower() for x in lists.split(",") if _strip(x) ] or ["green"]
-    resp: Dict[str, Any] = {"ts": now_ms(), "lists": {}}
+    return _json_response(out)
+
+def _snap_entry(lists: str, fresh_only: int, max_age_secs: int) -> tuple:
+    wanted = _parse_lists(lists)
+    key, version, now = (wanted, fresh_only, max_age_secs), _tv_version, now_ms()
+    hit = _snap_cache.get(key)
+    if hit and hit[1] == version and now - hit[0] < SNAP_CACHE_TTL_MS:
+        return hit
+    resp: Dict[str, Any] = {"ts": now, "lists": {}}
     for name in wanted:
         resp["lists"][name] = _tv_collect(name, fresh_only, max_age_secs)
-    return resp
+    if key not in _snap_cache and len(_snap_cache) >= 64:  # keys are client-controlled
+        try: _snap_cache.pop(next(iter(_snap_cache)), None)  # FIFO: drop the oldest key
+        except (StopIteration, RuntimeError): pass  # raced another threadpool reader
+    hit = _snap_cache[key] = (now, version, resp, {})
+    return hit
+
+def _entry_render(entry: tuple, render) -> Any:
+    _, _, payload, rendered = entry
+    out = rendered.get(render)
+    if out is None: out = rendered[render] = render(payload)
+    return out
+
+def _snap_render(lists: str, fresh_only: int, max_age_secs: int, render) -> Any:
+    """Serialize the cached snap once per format; rendered output lives as long as the entry."""
+    return _entry_render(_snap_entry(lists, fresh_only, max_age_secs), render)
+
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+# Routes return prebuilt responses so FastAPI skips jsonable_encoder.
+@app.get("/snap", response_class=ORJSONResponse)
+def snap(lists: str = "green,macro,full", fresh_only: int = 1, max_age_secs: int = FRESH_CUTOFF_SECS):
+    body = _snap_render(lists, fresh_only, max_age_secs, orjson.dumps)
+    return Response(body, media_type="application/json")
+
+_SNAP_SSR_HEAD = (
+    "<!doctype html><meta charset='utf-8'/><title>WWASD Snap</title>"
+    "<body style='background:#0b0f14;color:#e6edf3;font:14px system-ui;padding:16px'>"
+)
+_SNAP_SSR_TABLE = (
+    "<table style='width:100%;border-collapse:collapse'>"
+    "<thead><tr><th style='text-align:left;border-bottom:1px solid #1f2937;padding:6px 5px'>Symbol</th>"
+    "<th style='text-align:left;border-bottom:1px solid #1f2937;padding:6px 5px'>Fresh</th></tr></thead><tbody>"
+)
+_SNAP_SSR_EMPTY = "<tr><td colspan='2'>No items</td></tr>"
+
+def _render_snap_ssr(snap_json: Dict[str, Any]) -> bytes:
+    parts: List[str] = [_SNAP_SSR_HEAD]
+    append = parts.append
+    for name, data in snap_json["lists"].items():
+        # list names come straight from the query string
+        append(f"<h2 style='font:600 14px system-ui;margin:12px 0 6px'>{html.escape(name.upper())} — count {data.get('count',0)}</h2>")
+        append(_SNAP_SSR_TABLE)
+        items = data.get("items",[])
+        for it in items:
+            append(f"<tr><td>{_sym_html(it.get('symbol',''))}</td><td>{'fresh' if it.get('is_fresh') else 'stale'}</td></tr>")
+        if not items: append(_SNAP_SSR_EMPTY)
+        append("</tbody></table>")
+    append("</body>")
+    return "".join(parts).encode()  # cached per snapshot, so encoded once
 
 @app.get("/snap_ssr.html")
 def snap_ssr(lists: str = "green,macro,full", fresh_only: int = 1, max_age_secs: int = FRESH_CUTOFF_SECS):
-    snap_json = snap(lists=lists, fresh_only=fresh_only, max_age_secs=max_age_secs)
-    parts: List[str] = []
-    for name, data in snap_json["lists"].items():
-        rows = "".join(
-            f"<tr><td>{html.escape(it.get('symbol',''))}</td>"
-            f"<td>{'fresh' if it.get('is_fresh') else 'stale'}</td></tr>"
-            for it in data.get("items",[])
-        ) or "<tr><td colspan='2'>No items</td></tr>"
-        parts.append(
-            f"<h2 style='font:600 14px system-ui;margin:12px 0 6px'>{name.upper()} — count {data.get('count',0)}</h2>"
-            f"<table style='width:100%;border-collapse:collapse'>"
-            f"<thead><tr><th style='text-align:left;border-bottom:1px solid #1f2937;padding:6px 5px'>Symbol</th>"
-            f"<th style='text-align:left;border-bottom:1px solid #1f2937;padding:6px 5px'>Fresh</th></tr></thead>"
-            f"<tbody>{rows}</tbody></table>"
-        )
-    html_doc = (
-        "<!doctype html><meta charset='utf-8'/><title>WWASD Snap</title>"
-        "<body style='background:#0b0f14;color:#e6edf3;font:14px system-ui;padding:16px'>"
-        + "".join(parts) + "</body>"
-    )
-    return HTMLResponse(html_doc, headers={"Cache-Control": "no-store"})
+    doc = _snap_render(lists, fresh_only, max_age_secs, _render_snap_ssr)
+    return HTMLResponse(doc, headers={"Cache-Control": "no-store"})
 
 # ---------- New plain JSON endpoint ----------
 @app.get("/snap.json")
-def snap_json(lists: str = "green,macro,full", fresh_only: int = 1, max_age_secs: int = FRESH_CUTOFF_SECS):
+def snap_json(request: Request, lists: str = "green,macro,full", fresh_only: int = 1, max_age_secs: int = FRESH_CUTOFF_SECS):
     """
     Return the snap JSON for simpler consumption by bots.  Instead of sending an
     application/json content type (which some sandboxed environments block),
@@ -259,9 +438,25 @@ def snap_json(lists: str = "green,macro,full", fresh_only: int = 1, max_age_secs
     as plain text with a JSON media type.  This avoids fetch restrictions
     while preserving the same information.
     """
-    payload = snap(lists=lists, fresh_only=fresh_only, max_age_secs=max_age_secs)
+    entry = _snap_entry(lists, fresh_only, max_age_secs)
+    etag = _entry_render(entry, _snap_etag)
+    hit = _not_modified(request, etag)
+    if hit: return hit
     # Serve the JSON as plain text; some environments block application/json
-    return PlainTextResponse(json.dumps(payload), media_type="application/json")
+    body = _entry_render(entry, orjson.dumps)
+    return PlainTextResponse(body, media_type="application/json", headers={"ETag": etag})
+
+def _snap_etag(payload: Dict[str, Any]) -> str:
+    # Hash of the lists only: "ts" changes on every rebuild (each SNAP_CACHE_TTL_MS),
+    # while is_fresh flips with time even when _tv_version does not move
+    return '"%s"' % hashlib.blake2b(orjson.dumps(payload["lists"]), digest_size=8).hexdigest()
+
+def _dumps_pretty(payload: Dict[str, Any]) -> bytes:
+    # Pretty-print the JSON with indentation to ensure line breaks for sandbox viewers
+    return orjson.dumps(payload, option=orjson.OPT_INDENT_2)
+
+def _render_snap_raw(pretty: bytes) -> bytes:
+    return b"".join((b"<pre>", html.escape(pretty.decode()).encode(), b"</pre>"))
 
 # ---------- Additional HTML wrapper for JSON (to circumvent browser sandbox blocking) ----------
 @app.get("/snap_raw.html")
@@ -272,11 +467,11 @@ def snap_raw_html(lists: str = "green,macro,full", fresh_only: int = 1, max_age_
     allow HTML to render.  This route escapes the JSON and embeds it into a
     <pre> element so it can be viewed and copied from a normal browser.
     """
-    payload = snap(lists=lists, fresh_only=fresh_only, max_age_secs=max_age_secs)
-    # Pretty-print the JSON with indentation to ensure line breaks for sandbox viewers
-    json_str = json.dumps(payload, indent=2)
-    escaped  = html.escape(json_str)
-    return HTMLResponse(f"<pre>{escaped}</pre>", headers={"Cache-Control": "no-store"})
+    entry = _snap_entry(lists, fresh_only, max_age_secs)
+    doc = entry[3].get(_render_snap_raw)
+    if doc is None:  # wrap the /snap_plain.txt bytes instead of serializing again
+        doc = entry[3][_render_snap_raw] = _render_snap_raw(_entry_render(entry, _dumps_pretty))
+    return HTMLResponse(doc, headers={"Cache-Control": "no-store"})
 
 # ---------- Plain-text snapshot (for environments that can’t render HTML or JSON) ----------
 @app.get("/snap_plain.txt")
@@ -286,76 +481,106 @@ def snap_plain_txt(lists: str = "green,macro,full", fresh_only: int = 1, max_age
     display JSON or HTML properly, but they will display a text/plain response.
     The indentation makes it readable and parsable.
     """
-    payload = snap(lists=lists, fresh_only=fresh_only, max_age_secs=max_age_secs)
-    pretty  = json.dumps(payload, indent=2)
+    pretty = _snap_render(lists, fresh_only, max_age_secs, _dumps_pretty)
     return PlainTextResponse(pretty, media_type="text/plain")
 
 # ---------- Port JSON ----------
-@app.get("/blofin/latest")
-def blofin_latest():
-    global _blofin_last_ms, _blofin_latest
-    if not _blofin_latest:
+def _blofin_view() -> Dict[str, Any]:
+    global _blofin_state
+    latest, last_ms = _blofin_state
+    if not latest:
         # try disk on first access
         disk = _blofin_load_last()
-        if disk:
-            with _blofin_lock:
-                _blofin_latest = disk
-                _blofin_last_ms = disk.get("server_received_ms") or disk.get("ts") or now_ms()
-        else:
+        if not disk:
             return {"fresh": False, "ts": None, "count": 0, "positions": [], "data": None}
-    ts = _blofin_last_ms or _blofin_latest.get("client_ts") or _blofin_latest.get("ts")
+        latest, last_ms = disk, disk.get("server_received_ms") or disk.get("ts") or now_ms()
+        if not _blofin_state[0]: _blofin_state = (latest, last_ms)  # don't clobber a push that landed meanwhile
+    ts = last_ms or latest.get("client_ts") or latest.get("ts")
     fresh = _fresh_ms(int(ts) if ts else None, BLOFIN_TTL_SEC)
-    positions = _extract_positions(_blofin_latest.get("data") if _blofin_latest else None)
+    positions = _extract_positions(latest.get("data"))
     return {
         "fresh": fresh,
         "ts": int(ts) if ts else None,
         "count": len(positions),
         "positions": positions,
-        "data": _blofin_latest,
+        "data": latest,
     }
 
+@app.get("/blofin/latest", response_class=ORJSONResponse)
+def blofin_latest(request: Request):
+    view = _blofin_view()
+    # the body is a function of the stored push (its ts) and the fresh flag
+    etag = f'"{view["ts"]}-{int(view["fresh"])}"'
+    return _not_modified(request, etag) or ORJSONResponse(view, headers={"ETag": etag})
+
 # ---------- Port SSR ----------
 
-def _fmt(v: Any) -> str: return html.escape(str(v)) if v is not None else ""
+_NO_ESCAPE_TYPES = (int, float, bool)  # str() of these never contains &<>"'
 
-def _render_port_html(latest: Optional[Dict[str, Any]]) -> str:
-    fresh = False; ts_ms = None; rows_html = ""
-    if latest:
-        fresh = bool(latest.get("fresh")); ts_ms = latest.get("ts")
-        positions = latest.get("positions") or []
-        for p in positions:
-            inst = p.get("instId") or p.get("symbol") or "?"
-            side = (p.get("positionSide") or p.get("posSide") or p.get("side") or "net").upper()
-            sz   = p.get("positions") or p.get("pos") or p.get("size") or p.get("qty") or "-"
-            avg  = p.get("averagePrice") or p.get("avgPx") or p.get("avg") or "-"
-            mark = p.get("markPrice") or p.get("markPx") or p.get("mark") or "-"
-            lev  = p.get("leverage") or p.get("lever") or "-"
-            rows_html += f"<tr><td>{_fmt(inst)}</td><td>{_fmt(side)}</td><td>{_fmt(sz)}</td><td>{_fmt(avg)}</td><td>{_fmt(mark)}</td><td>{_fmt(lev)}</td></tr>"
-    ts_txt = "-" if not ts_ms else time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(int(ts_ms)/1000))
-    pill = '<span style="padding:.15rem .45rem;border-radius:.5rem;font-size:.8rem;background:#2a6c2a;color:#dff0d8">fresh</span>' \
-           if fresh else '<span style="padding:.15rem .45rem;border-radius:.5rem;font-size:.8rem;background:#5a5a5a;color:#eee">stale</span>'
-    table = rows_html or '<tr><td colspan="6" style="opacity:.6">No open positions</td></tr>'
-    return f"""
+def _fmt(v: Any) -> str:
+    """Cell text, HTML-escaped; numbers/bools skip html.escape's five replace passes."""
+    if v is None: return ""
+    return str(v) if type(v) in _NO_ESCAPE_TYPES else html.escape(str(v))
+
+# Static chunks are kept as bytes; the page is assembled with b"".join.
+_PORT_PILL_FRESH = b'<span style="padding:.15rem .45rem;border-radius:.5rem;font-size:.8rem;background:#2a6c2a;color:#dff0d8">fresh</span>'
+_PORT_PILL_STALE = b'<span style="padding:.15rem .45rem;border-radius:.5rem;font-size:.8rem;background:#5a5a5a;color:#eee">stale</span>'
+_PORT_EMPTY_ROW  = b'<tr><td colspan="6" style="opacity:.6">No open positions</td></tr>'
+_PORT_HTML_HEAD = b"""
 <!doctype html><html lang="en"><head><meta charset="utf-8">
 <meta name="viewport" content="width=device-width, initial-scale=1"><title>WWASD Port</title>
 <style>
- body{{font-family:system-ui,-apple-system,Segoe UI,Roboto,Ubuntu,Arial,sans-serif;margin:24px;background:#0b0f14;color:#e6edf3}}
- table{{width:100%;border-collapse:collapse;margin-top:12px}}
- th,td{{border-bottom:1px solid #1f2937;padding:8px;text-align:left;font-size:14px}}
- .pill{{padding:.15rem .45rem;border-radius:.5rem;font-size:.8rem}}
- th{{text-align:left;color:#a9b0bc;font-weight:600}}
- .sub{{color:#8a92a6;font-size:.9rem}}
+ body{font-family:system-ui,-apple-system,Segoe UI,Roboto,Ubuntu,Arial,sans-serif;margin:24px;background:#0b0f14;color:#e6edf3}
+ table{width:100%;border-collapse:collapse;margin-top:12px}
+ th,td{border-bottom:1px solid #1f2937;padding:8px;text-align:left;font-size:14px}
+ .pill{padding:.15rem .45rem;border-radius:.5rem;font-size:.8rem}
+ th{text-align:left;color:#a9b0bc;font-weight:600}
+ .sub{color:#8a92a6;font-size:.9rem}
 </style>
 </head><body><div class="wrap">
-  <h1>WWASD Port <span class="sub">last update (server): {ts_txt} {pill}</span></h1>
+  <h1>WWASD Port <span class="sub">last update (server): """
+_PORT_HTML_MID = b"""</span></h1>
   <table>
     <thead><tr><th>Instrument</th><th>Side</th><th>Sz</th><th>Avg</th><th>Mark</th><th>Lev</th></tr></thead>
-    <tbody>{table}</tbody>
+    <tbody>"""
+_PORT_HTML_TAIL = b"""</tbody>
   </table>
 </div></body></html>"""
 
+# Rows only change when a new BLOFIN_POSITIONS body lands; the pill/timestamp
+# are per request (freshness is time-based). Keyed on the body object itself.
+_port_rows_cache: tuple = (None, _PORT_EMPTY_ROW)  # (blofin body, encoded <tr> rows)
+
+def _port_rows(latest: Dict[str, Any]) -> bytes:
+    global _port_rows_cache
+    src = latest.get("data")
+    cached_src, cached_rows = _port_rows_cache  # one read: threadpool renders may swap it
+    if src is not None and cached_src is src: return cached_rows
+    rows: List[str] = []
+    append = rows.append
+    for p in latest.get("positions") or []:
+        inst = p.get("instId") or p.get("symbol") or "?"
+        side = (p.get("positionSide") or p.get("posSide") or p.get("side") or "net").upper()
+        sz   = p.get("positions") or p.get("pos") or p.get("size") or p.get("qty") or "-"
+        avg  = p.get("averagePrice") or p.get("avgPx") or p.get("avg") or "-"
+        mark = p.get("markPrice") or p.get("markPx") or p.get("mark") or "-"
+        lev  = p.get("leverage") or p.get("lever") or "-"
+        append(f"<tr><td>{_fmt(inst)}</td><td>{_fmt(side)}</td><td>{_fmt(sz)}</td><td>{_fmt(avg)}</td><td>{_fmt(mark)}</td><td>{_fmt(lev)}</td></tr>")
+    table = "".join(rows).encode() or _PORT_EMPTY_ROW
+    _port_rows_cache = (src, table)
+    return table
+
+def _render_port_html(latest: Optional[Dict[str, Any]]) -> bytes:
+    fresh = False; ts_ms = None; table = _PORT_EMPTY_ROW
+    if latest:
+        fresh = bool(latest.get("fresh")); ts_ms = latest.get("ts")
+        table = _port_rows(latest)
+    ts_txt = b"-" if not ts_ms else time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(int(ts_ms)/1000)).encode()
+    pill = _PORT_PILL_FRESH if fresh else _PORT_PILL_STALE
+    return b"".join((_PORT_HTML_HEAD, ts_txt, b" ", pill, _PORT_HTML_MID, table, _PORT_HTML_TAIL))
+
 @app.get("/port2_ssr.html")
-def port2_ssr_html(): return HTMLResponse(_render_port_html(blofin_latest()), headers={"Cache-Control":"no-store"})
+def port2_ssr_html(): return HTMLResponse(_render_port_html(_blofin_view()), headers={"Cache-Control":"no-store"})
 
 @app.get("/port2.html")
 def port2_html():
@@ -428,11 +653,10 @@ def _tv_write_atomic(obj: Dict[str, Dict[str, Any]]) -> None:
         d = os.path.dirname(path)
         if d:
             os.makedirs(d, exist_ok=True)
-        tmp = path + ".tmp"
-        with open(tmp, "w", encoding="utf-8") as f:
-            # Store a minimal object we can re‑hydrate from
-            json.dump({"items": obj, "ts": now_ms()}, f, separators=(",", ":"), ensure_ascii=False)
-        os.replace(tmp, path)
+        # dict.copy() is one C call under the GIL, so ingest can't resize the
+        # dict mid-encode; items themselves are replaced, never mutated.
+        # Store a minimal object we can re‑hydrate from
+        _write_atomic(path, orjson.dumps({"items": obj.copy(), "ts": now_ms()}))
     except Exception:
         # Non‑fatal; in‑memory state still used
         pass
@@ -443,8 +667,8 @@ def _tv_load_last() -> Optional[Dict[str, Dict[str, Any]]]:
         path = TV_LATEST_CACHE_PATH
         if not os.path.exists(path):
             return None
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open(path, "rb") as f:
+            data = _loads(f.read())
         items = data.get("items")
         return items if isinstance(items, dict) else None
     except Exception:
@@ -454,14 +678,20 @@ def _tv_load_last() -> Optional[Dict[str, Dict[str, Any]]]:
 try:
     _pre = _tv_load_last()
     if _pre:
-        _tv_latest.update(_pre)
+        for _sym, _st in _pre.items():
+            _sym = sys.intern(_sym); _tv_latest[_sym] = _st; _tv_index(_sym)
 except Exception:
     pass
 
-# Background saver: write snapshot every ~10s so /snap* never starts empty
+# Background saver: flush the snapshot after ingest marks it dirty so /snap*
+# never starts empty; the 2s nap coalesces a burst of alerts into one write
+_tv_dirty = threading.Event()
+
 def _tv_saver_loop():
     while True:
-        time.sleep(10)
+        _tv_dirty.wait()
+        _tv_dirty.clear()
+        time.sleep(2.0)
         try:
             _tv_write_atomic(_tv_latest)
         except Exception:
@@ -504,47 +734,47 @@ def _rows_from_snap(snap_json: Dict[str, Any]) -> List[Dict[str, Any]]:
     return rows
     
 # CSV snapshot (desk‑friendly)
-@app.get("/snap.csv")
-def snap_csv(lists: str = "green,macro,full", fresh_only: int = 1, max_age_secs: int = FRESH_CUTOFF_SECS):
-    payload = snap(lists=lists, fresh_only=fresh_only, max_age_secs=max_age_secs)
+def _render_snap_csv(payload: Dict[str, Any]) -> str:
     rows = _rows_from_snap(payload)
     cols = ["symbol","cmp","ema12_state","qvwap_state","hh","hl","lh","ll","rsi","is_fresh","htf_sig","htf_rating"]
 
-    def _fmt(v: Any) -> str:
-        if isinstance(v, bool): return "true" if v else "false"
-        if v is None: return ""
-        s = str(v)
-        if any(c in s for c in [",", "\"", "\n"]):
-            s = s.replace("\"", "\"\"")
-            s = f"\"{s}\""
-        return s
+    def _cell(v: Any) -> Any:
+        # csv writes None as "" itself; keep JSON-style booleans
+        if v is True: return "true"
+        if v is False: return "false"
+        return v
 
-    lines = [",".join(cols)]
-    for r in rows:
-        lines.append(",".join(_fmt(r.get(c)) for c in cols))
-    body = "\n".join(lines)
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+    w.writerow(cols)
+    w.writerows([_cell(r.get(c)) for c in cols] for r in rows)
+    return buf.getvalue()
+
+@app.get("/snap.csv")
+def snap_csv(lists: str = "green,macro,full", fresh_only: int = 1, max_age_secs: int = FRESH_CUTOFF_SECS):
+    body = _snap_render(lists, fresh_only, max_age_secs, _render_snap_csv)
     return PlainTextResponse(body, media_type="text/csv", headers={"Cache-Control": "no-store"})
 
 # Simple HTML table snapshot (for sandboxes that can’t parse JSON)
-@app.get("/snap_table.html")
-def snap_table_html(lists: str = "green,macro,full", fresh_only: int = 1, max_age_secs: int = FRESH_CUTOFF_SECS):
-    payload = snap(lists=lists, fresh_only=fresh_only, max_age_secs=max_age_secs)
-    rows = _rows_from_snap(payload)
-    head = f"""<!doctype html><meta charset="utf-8"><title>WWASD Snap Table</title>
+_SNAP_TABLE_HEAD = """<!doctype html><meta charset="utf-8"><title>WWASD Snap Table</title>
 <style>
- body{{background:#0b0f14;color:#e6edf3;font:14px system-ui;padding:16px}}
- table{{width:100%;border-collapse:collapse}}
- th,td{{border-bottom:1px solid #1f2937;padding:6px 5px;text-align:left}}
- th{{color:#a9b0bc;font-weight:600}}
- .good{{color:#34d399}} .bad{{color:#f87171}} .muted{{color:#94a3b8}}
+ body{background:#0b0f14;color:#e6edf3;font:14px system-ui;padding:16px}
+ table{width:100%;border-collapse:collapse}
+ th,td{border-bottom:1px solid #1f2937;padding:6px 5px;text-align:left}
+ th{color:#a9b0bc;font-weight:600}
+ .good{color:#34d399} .bad{color:#f87171} .muted{color:#94a3b8}
 </style>
-<h1>WWASD Snapshot <span class="muted">(fresh_only={fresh_only})</span></h1>
+<h1>WWASD Snapshot <span class="muted">(fresh_only="""
+_SNAP_TABLE_THEAD = """)</span></h1>
 <table><thead><tr>
   <th>Symbol</th><th>CMP</th><th>EMA12</th><th>QVWAP</th><th>HH</th><th>HL</th><th>LH</th><th>LL</th>
   <th>RSI</th><th>Fresh</th><th>HTF Sig</th><th>HTF Rating</th>
 </tr></thead><tbody>"""
+
+def _render_snap_table_rows(payload: Dict[str, Any]) -> str:
+    rows = _rows_from_snap(payload)
     def td(v: Any, cls: str = "") -> str:
-        s = html.escape("" if v is None else str(v))
+        s = _fmt(v)
         c = f' class="{cls}"' if cls else ""
         return f"<td{c}>{s}</td>"
 
@@ -552,13 +782,43 @@ def snap_table_html(lists: str = "green,macro,full", fresh_only: int = 1, max_ag
     for r in rows:
         fresh_cls = "good" if r.get("is_fresh") else "bad"
         body_rows.append(
-            "<tr>" +
-            td(r.get("symbol")) + td(r.get("cmp")) + td(r.get("ema12_state")) + td(r.get("qvwap_state")) +
+            "<tr><td>" + _sym_html(r.get("symbol") or "") + "</td>" + td(r.get("cmp")) + td(r.get("ema12_state")) + td(r.get("qvwap_state")) +
             td(r.get("hh")) + td(r.get("hl")) + td(r.get("lh")) + td(r.get("ll")) +
             td(r.get("rsi")) + td("fresh" if r.get("is_fresh") else "stale", fresh_cls) +
             td(r.get("htf_sig")) + td(r.get("htf_rating")) +
             "</tr>"
         )
-    html_doc = head + "\n".join(body_rows) + "</tbody></table>"
+    return "\n".join(body_rows)
+
+@app.get("/snap_table.html")
+def snap_table_html(lists: str = "green,macro,full", fresh_only: int = 1, max_age_secs: int = FRESH_CUTOFF_SECS):
+    body_rows = _snap_render(lists, fresh_only, max_age_secs, _render_snap_table_rows)
+    html_doc = f"{_SNAP_TABLE_HEAD}{fresh_only}{_SNAP_TABLE_THEAD}{body_rows}</tbody></table>"
     return HTMLResponse(html_doc, headers={"Cache-Control": "no-store"})
 # ──────────────────────────────────────────────────────────────────────────────
+
+# ---------- Local entrypoint ----------
+# Procfile runs gunicorn + UvicornWorker; `python app.py` runs uvicorn directly.
+# Both pick uvloop + httptools when installed (requirements.txt); UVICORN_LOOP /
+# UVICORN_HTTP (auto|asyncio|uvloop, auto|h11|httptools) override for debugging.
+# UVICORN_ACCESS_LOG=0 silences per-request access lines (on by default).
+# Socket/body-read knobs are env-tunable (UVICORN_*):
+#   UVICORN_BACKLOG                       listen() backlog (default 2048)
+#   UVICORN_LIMIT_CONCURRENCY             503 above this many in-flight conns (default 1024)
+#   UVICORN_H11_MAX_INCOMPLETE_EVENT_SIZE cap on a not-yet-complete h11 event (request line +
+#                                         headers); bodies still stream as Data events. No
+#                                         effect under httptools, which http="auto" picks
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(
+        app,
+        host=os.getenv("UVICORN_HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=1,
+        loop=os.getenv("UVICORN_LOOP", "auto"),
+        http=os.getenv("UVICORN_HTTP", "auto"),
+        access_log=os.getenv("UVICORN_ACCESS_LOG", "1") == "1",  # Render logs are the runbook's triage trail
+        backlog=int(os.getenv("UVICORN_BACKLOG", "2048")),
+        limit_concurrency=int(os.getenv("UVICORN_LIMIT_CONCURRENCY", "1024")),
+        h11_max_incomplete_event_size=int(os.getenv("UVICORN_H11_MAX_INCOMPLETE_EVENT_SIZE", str(64 * 1024))),
+    )
@@ -1,5 +1,6 @@
 # blofin_hardening.py  —  Permanent hardening for Blofin Port endpoints
-import os, json, time, threading
+import os, time, threading
+import orjson
 from flask import Blueprint, current_app
 
 TTL_SEC = int(os.getenv("BLOFIN_TTL_SEC", "240"))  # freshness window
@@ -11,8 +12,8 @@ class _BlofinStore:
         self.lock = threading.Lock()
         self.last = {"fresh": False, "ts": None, "data": None}
         try:
-            with open(self.path, "r", encoding="utf-8") as f:
-                self.last = json.load(f)
+            with open(self.path, "rb") as f:
+                self.last = orjson.loads(f.read())
         except Exception:
             pass
 
@@ -21,8 +22,8 @@ class _BlofinStore:
         if d:
             os.makedirs(d, exist_ok=True)
         tmp = self.path + ".tmp"
-        with open(tmp, "w", encoding="utf-8") as f:
-            json.dump(obj, f, separators=(",", ":"), ensure_ascii=False)
+        with open(tmp, "wb") as f:
+            f.write(orjson.dumps(obj))
         os.replace(tmp, self.path)  # atomic on POSIX & Windows
 
     def update(self, payload: dict):
@@ -62,7 +63,7 @@ def blofin_latest():
     """NEVER 500. Always returns a simple JSON envelope with .fresh/.ts/.age_sec/.data."""
     obj = _store.latest()
     resp = current_app.response_class(
-        response=json.dumps(obj, separators=(",", ":")),
+        response=orjson.dumps(obj),  # compact UTF-8, no \uXXXX expansion
         status=200,
         mimetype="application/json",
     )
@@ -1,5 +1,5 @@
 """
-WWASD TradingView Alert Setup (with DEBUG prints)
+WWASD TradingView Alert Setup
 
 Automates creation of TradingView alerts for your "green" and "macro" watchlists.
 - Uses Playwright to control TradingView, applies your template, adds WWASD_State_Emitter.
@@ -16,53 +16,175 @@ Environment (set before running):
     TEMPLATE_NAME       -> your saved TV template name (e.g. "WWASD_State_Emitter")
     SNIPER_MODE         -> "true" to use 5M instead of 15M
     HEADFUL             -> "true" to see the browser; omit/false for headless
+    WWASD_CONCURRENCY   -> symbols processed in parallel (one page each); default 4
+    WWASD_SYMBOL_TIMEOUT -> seconds allowed per symbol before its page is recycled;
+                           default is the sum of the step timeouts (symbol_budget_s)
+    WWASD_LOG           -> log level; DEBUG shows every click/fill (default INFO)
     TV_SESSION_COOKIE   -> (recommended) a valid TradingView session cookie
     TV_USERNAME/TV_PASSWORD -> fallback only if you don’t supply TV_SESSION_COOKIE
+    WWASD_PROFILE       -> Chromium profile dir reused across runs (default .wwasd_profile)
 """
 
 import argparse
 import asyncio
+import json
+import logging
 import os
-from typing import List
+from typing import Dict, FrozenSet, List, Tuple
 from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
 
-from playwright.async_api import async_playwright, TimeoutError as PWTimeout
+from playwright.async_api import Locator, async_playwright, TimeoutError as PWTimeout
 
-print("DEBUG: Script started")
+log = logging.getLogger("wwasd")
 
 TIMEFRAMES = {"1D": "D", "4H": "240", "1H": "60", "15M": "15", "5M": "5"}
+# Alert timeframes per run; sniper mode swaps 15M for 5M
+ALERT_TFS = ("1D", "4H", "1H", "15M")
+SNIPER_TFS = ("1D", "4H", "1H", "5M")
+# TV's alert list ({"s": "ok", "r": [{"symbol", "resolution", ...}]})
+ALERTS_URL = os.environ.get("TV_ALERTS_URL", "https://pricealerts.tradingview.com/list_alerts")
+# Persistent Chromium profile: HTTP cache (TV's JS/wasm), cookies and
+# localStorage survive runs; delete the directory to force a fresh login
+PROFILE_DIR = os.environ.get("WWASD_PROFILE", ".wwasd_profile")
+
+# Step timeouts (ms). The per-symbol budget (symbol_budget_s) is their
+# worst-case sum, so a slow-but-progressing symbol is never cut off.
+ACTION_TIMEOUT_MS   = 15000  # clicks/fills; also the context default
+WAIT_TIMEOUT_MS     = 8000   # symbol switch, timeframe switch, dialog close
+OPTIONAL_TIMEOUT_MS = 3000   # controls some UI variants omit; indicator search
+NAV_TIMEOUT_MS      = 30000  # page.goto
+
+# Pooled pages sit in background tabs, so keep Chromium from throttling
+# their timers and renderers
+CHROMIUM_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    # Skip what the alert workflow never needs without request interception
+    # (routing would disable the HTTP cache the persistent profile is for)
+    "--blink-settings=imagesEnabled=false",
+    "--host-resolver-rules=" + ", ".join(
+        f"MAP {h} ~NOTFOUND" for h in (
+            "*.google-analytics.com", "*.googletagmanager.com", "*.doubleclick.net",
+        )
+    ),
+]
+
+# Page-side helpers, installed once per context (add_init_script) so call
+# sites evaluate a short expression instead of shipping the function body.
+JS_HELPERS = """
+window.__wwasdGetSymbols = () =>
+    Array.from(document.querySelectorAll('[data-symbol]'))
+         .map(el => el.getAttribute('data-symbol'))
+         .filter(Boolean);
+
+// Search and click each name in the open Indicators dialog; returns how
+// many were added so the caller can finish the rest the slow way.
+window.__wwasdAddIndicators = async (names, waitMs) => {
+    const input = document.querySelector("input[placeholder*='Search']");
+    if (!input) return 0;
+    let added = 0;
+    for (const name of names) {
+        input.focus();
+        input.select();
+        document.execCommand('insertText', false, name);
+        let row = null;
+        for (let t = 0; t < waitMs && !row; t += 100) {
+            await new Promise(r => setTimeout(r, 100));
+            row = [...document.querySelectorAll('[data-role="list-item"]')]
+                .find(el => el.textContent.includes(name));
+        }
+        if (!row) break;
+        row.click();
+        added++;
+    }
+    return added;
+};
+"""
 
 # ---------------- small helpers ----------------
-async def safe_click(page, selector: str, label: str, timeout: int = 15000) -> bool:
+# Locators are lazy and re-resolve on every action, so one per (page, selector)
+# stays valid across navigations and is reused for every symbol/timeframe.
+_locators: Dict[Tuple[int, str], Locator] = {}
+
+def _locator(page, selector: str) -> Locator:
+    key = (id(page), selector)
+    loc = _locators.get(key)
+    if loc is None:
+        loc = _locators[key] = page.locator(selector).first
+    return loc
+
+def _forget_page(page) -> None:
+    """Drop a closed page's locators (its id() may be reused by a new page)."""
+    pid = id(page)
+    for key in [k for k in _locators if k[0] == pid]:
+        del _locators[key]
+
+async def safe_click(page, selector: str, label: str, timeout: int = ACTION_TIMEOUT_MS) -> bool:
     try:
-        await page.wait_for_selector(selector, timeout=timeout)
-        await page.click(selector)
-        print(f"DEBUG: clicked -> {label}")
+        # Locator actions auto-wait, so this is one round trip instead of two
+        await _locator(page, selector).click(timeout=timeout)
+        log.debug("clicked -> %s", label)
         return True
     except PWTimeout:
-        print(f"DEBUG: TIMEOUT waiting to click -> {label} ({selector})")
+        log.warning("TIMEOUT waiting to click -> %s (%s)", label, selector)
         return False
     except Exception as e:
-        print(f"DEBUG: ERROR clicking {label}: {e}")
+        log.error("ERROR clicking %s: %s", label, e)
         return False
 
-async def safe_fill(page, selector: str, value: str, label: str, timeout: int = 15000) -> bool:
+async def safe_fill(page, selector: str, value: str, label: str, timeout: int = ACTION_TIMEOUT_MS) -> bool:
     try:
-        await page.wait_for_selector(selector, timeout=timeout)
-        await page.fill(selector, value)
-        print(f"DEBUG: filled -> {label}")
+        await _locator(page, selector).fill(value, timeout=timeout)
+        log.debug("filled -> %s", label)
         return True
     except PWTimeout:
-        print(f"DEBUG: TIMEOUT waiting to fill -> {label} ({selector})")
+        log.warning("TIMEOUT waiting to fill -> %s (%s)", label, selector)
         return False
     except Exception as e:
-        print(f"DEBUG: ERROR filling {label}: {e}")
+        log.error("ERROR filling %s: %s", label, e)
         return False
 
+async def wait_settled(page, label: str, timeout: int = WAIT_TIMEOUT_MS) -> None:
+    """
+    Wait for network quiet after a navigation; best effort. Only meaningful
+    right after goto: on the same document it returns immediately.
+    """
+    try:
+        await page.wait_for_load_state("networkidle", timeout=timeout)
+    except PWTimeout:
+        log.debug("TIMEOUT waiting for network idle -> %s", label)
+
+# The header's interval button shows the active timeframe ("1D", "4h", "15m")
+_TIMEFRAME_IS_JS = """
+    tf => {
+        const b = document.querySelector("button[data-name='timeframe']");
+        return !!b && b.textContent.trim().toUpperCase() === tf;
+    }
+"""
+
+async def wait_timeframe(page, tf: str, timeout: int = WAIT_TIMEOUT_MS) -> None:
+    """Wait until the chart reports tf as its interval; best effort."""
+    try:
+        await page.wait_for_function(_TIMEFRAME_IS_JS, arg=tf, timeout=timeout)
+    except PWTimeout:
+        log.warning("TIMEOUT waiting for timeframe -> %s", tf)
+
 # ---------------- core steps ----------------
+async def _has_session(context) -> bool:
+    """Whether the (persistent) context still carries a TradingView session cookie."""
+    cookies = await context.cookies("https://www.tradingview.com")
+    return any(c["name"] == "sessionid" and c["value"] for c in cookies)
+
 async def login(page) -> None:
     """
     Login via session cookie (preferred) or TV_USERNAME/TV_PASSWORD (fallback).
+    The env cookie is always (re)applied so a rotated cookie replaces the one
+    saved in PROFILE_DIR; the email flow runs only when the profile holds no
+    session cookie.
     """
     cookie = os.environ.get("TV_SESSION_COOKIE", "")  # <— no more hard‑coded cookie
     user   = os.environ.get("TV_USERNAME")
@@ -73,13 +195,14 @@ async def login(page) -> None:
             {"name":"sessionid","value":cookie,"domain":".tradingview.com","path":"/","httpOnly":True,"secure":True},
             {"name":"auth_id",  "value":cookie,"domain":".tradingview.com","path":"/","httpOnly":True,"secure":True},
         ])
-        print("DEBUG: sessionid/auth_id cookies set from env")
+        log.debug("sessionid/auth_id cookies set from env")
 
-    await page.goto("https://www.tradingview.com/chart/")
-    print("DEBUG: navigated to /chart/")
+    # DOMContentLoaded is enough: every later step waits for the element it needs
+    await page.goto("https://www.tradingview.com/chart/", wait_until="domcontentloaded", timeout=NAV_TIMEOUT_MS)
+    log.debug("navigated to /chart/")
 
-    if not cookie and user and pwd:
-        print("DEBUG: attempting email login")
+    if not cookie and user and pwd and not await _has_session(page.context):
+        log.info("attempting email login")
         await safe_click(page, "text=Sign in", "Sign in button")
         await safe_click(page, "text=Sign in with email", "Sign in with email")
         await safe_fill(page, "input[name='username']", user, "username")
@@ -87,57 +210,87 @@ async def login(page) -> None:
         await safe_click(page, "button[type='submit']", "submit login")
         try:
             await page.wait_for_selector("div[class*='chart-container']", timeout=30000)
-            print("DEBUG: login complete, chart container visible")
+            log.info("login complete, chart container visible")
         except PWTimeout:
-            print("DEBUG: login may have 2FA or changed UI; continuing anyway")
+            log.warning("login may have 2FA or changed UI; continuing anyway")
+
+async def get_existing_alerts(context) -> FrozenSet[Tuple[str, str]]:
+    """
+    (symbol, resolution) pairs that already have an alert, read once per run
+    with the context's session cookies. Empty on any failure, so nothing is
+    skipped.
+    """
+    try:
+        resp = await context.request.get(ALERTS_URL, timeout=15000)
+        rows = (await resp.json()).get("r") or []
+    except Exception as e:
+        log.warning("could not read existing alerts: %s", e)
+        return frozenset()
+    existing = set()
+    for a in rows:
+        sym = a.get("symbol") or ""
+        if sym.startswith("="):  # '={"symbol": "BINANCE:BTCUSDT", ...}'
+            try:
+                sym = json.loads(sym[1:]).get("symbol", "")
+            except ValueError:
+                continue
+        existing.add((sym, str(a.get("resolution", ""))))
+    log.info("found %d existing alerts", len(existing))
+    return frozenset(existing)
 
 async def get_symbols_from_watchlist(page) -> List[str]:
-    print("DEBUG: collecting symbols from watchlist")
+    log.debug("collecting symbols from watchlist")
     try:
         await page.wait_for_selector("[data-symbol]", timeout=10000)
-        symbols = await page.evaluate("""
-            () => Array.from(document.querySelectorAll('[data-symbol]'))
-                        .map(el => el.getAttribute('data-symbol'))
-                        .filter(Boolean)
-        """)
-        print(f"DEBUG: found {len(symbols)} symbols (data-symbol)")
+        symbols = await page.evaluate("window.__wwasdGetSymbols()")
+        log.info("found %d symbols (data-symbol)", len(symbols))
         return symbols
     except Exception as e:
-        print(f"DEBUG: ERROR reading watchlist: {e}")
+        log.error("ERROR reading watchlist: %s", e)
         return []
 
 async def apply_template_and_indicator(page, template_name: str) -> None:
-    print(f"DEBUG: applying template '{template_name}' and WWASD emitter")
+    log.debug("applying template '%s' and WWASD emitter", template_name)
+    names = [template_name, "WWASD_State_Emitter"]
     await safe_click(page, "button[aria-label='Indicators']", "Indicators button")
-    await safe_fill(page, "input[placeholder*='Search']", template_name, "indicator search")
-    await asyncio.sleep(0.5)
-    await safe_click(page, f"text={template_name}", f"template {template_name}")
-    await safe_fill(page, "input[placeholder*='Search']", "WWASD_State_Emitter", "indicator search (WWASD)")
-    await asyncio.sleep(0.5)
-    await safe_click(page, "text=WWASD_State_Emitter", "WWASD_State_Emitter")
+    # Both searches in one evaluate; whatever it could not add goes through
+    # the per-step fill/click path
+    try:
+        added = await page.evaluate("([names, ms]) => window.__wwasdAddIndicators(names, ms)",
+                                    [names, OPTIONAL_TIMEOUT_MS])
+    except Exception as e:
+        log.debug("batched indicator add failed: %s", e)
+        added = 0
+    for name in names[added:]:
+        await safe_fill(page, "input[placeholder*='Search']", name, f"indicator search ({name})")
+        await asyncio.sleep(0.5)
+        await safe_click(page, f"text={name}", f"indicator {name}")
     await page.keyboard.press("Escape")
-    print("DEBUG: template/indicator applied")
+    log.debug("template/indicator applied")
 
 async def create_alert(page, webhook_url: str) -> None:
-    print("DEBUG: creating alert")
+    log.debug("creating alert")
     await safe_click(page, "button[aria-label='Alerts']", "Alerts button")
     await safe_click(page, "text=Create alert", "Create alert")
     # Once-per-bar-close if the dropdown exists (some Pine alerts hide it)
-    await safe_click(page, "select[name='frequency']", "frequency dropdown")
     try:
-        await page.select_option("select[name='frequency']", "once_per_bar_close")
-        print("DEBUG: frequency set to once_per_bar_close")
+        await page.select_option("select[name='frequency']", "once_per_bar_close", timeout=OPTIONAL_TIMEOUT_MS)
+        log.debug("frequency set to once_per_bar_close")
     except Exception as e:
-        print(f"DEBUG: frequency select skipped: {e}")
+        log.debug("frequency select skipped: %s", e)
     await safe_fill(page, "input[name='webhook_url']", webhook_url, "webhook_url")
     try:
-        await page.check("input[name='include_snapshot']")
-        print("DEBUG: include_snapshot checked")
+        await page.check("input[name='include_snapshot']", timeout=OPTIONAL_TIMEOUT_MS)
+        log.debug("include_snapshot checked")
     except Exception:
-        print("DEBUG: snapshot checkbox not found (UI variant)")
+        log.debug("snapshot checkbox not found (UI variant)")
     await safe_click(page, "button:has-text('Create')", "Create (save alert)")
-    await page.wait_for_timeout(1000)
-    print("DEBUG: alert created")
+    # The dialog closes once TV has saved the alert
+    try:
+        await page.wait_for_selector("input[name='webhook_url']", state="detached", timeout=WAIT_TIMEOUT_MS)
+    except PWTimeout:
+        log.warning("TIMEOUT waiting for alert dialog to close")
+    log.debug("alert created")
 
 def _tokenize(url: str, token: str) -> str:
     """
@@ -145,30 +298,94 @@ def _tokenize(url: str, token: str) -> str:
     """
     if not url or not token:
         return url
+    if "?" not in url and "#" not in url:
+        # Common case (bare .../tv): nothing to merge, skip the parse/rebuild
+        return f"{url}?{urlencode({'token': token})}"
     u = urlparse(url)
     q = dict(parse_qsl(u.query))
     if "token" not in q:
         q["token"] = token
     return urlunparse((u.scheme, u.netloc, u.path, u.params, urlencode(q), u.fragment))
 
-async def process_symbol(page, symbol: str, relay_url: str, sniper: bool, template_name: str) -> None:
-    print(f"DEBUG: processing symbol {symbol}")
-    await page.goto(f"https://www.tradingview.com/chart/?symbol={symbol}")
-    await page.wait_for_timeout(1000)
+# In-page symbol switch; false when the chart widget API is not available
+# (fresh page, or a TV build that does not expose it).
+_SET_SYMBOL_JS = """
+    sym => {
+        const w = window.tvWidget;
+        if (!w || !w.activeChart) return false;
+        w.activeChart().setSymbol(sym);
+        return true;
+    }
+"""
+_SYMBOL_IS_JS = """
+    sym => {
+        const cur = window.tvWidget.activeChart().symbol() || "";
+        return cur === sym || cur.endsWith(":" + sym) || sym.endsWith(":" + cur);
+    }
+"""
+# TV's tab title starts with the ticker ("BTCUSDT.P 67,120 ▲ ..."); compare the
+# whole leading token, since BTCUSDT.P -> BTCUSDT would pass a substring test
+_TITLE_IS_JS = """
+    sym => {
+        const lead = (document.title.trim().split(/\s+/)[0] || "").split(":").pop();
+        return lead.toUpperCase() === sym.split(":").pop().toUpperCase();
+    }
+"""
+
+async def open_symbol(page, symbol: str) -> None:
+    """Switch the loaded chart to symbol in place (widget API, then symbol
+    search); full navigation as the last resort."""
+    try:
+        if await page.evaluate(_SET_SYMBOL_JS, symbol):
+            await page.wait_for_function(_SYMBOL_IS_JS, arg=symbol, timeout=WAIT_TIMEOUT_MS)
+            log.debug("switched chart in place -> %s", symbol)
+            return
+    except Exception as e:
+        log.debug("in-place switch failed for %s: %s", symbol, e)
+    if "/chart/" in page.url:
+        # Typing on an open chart brings up symbol search; stays inside the SPA
+        try:
+            # Close any open dialog and give the chart focus, so the typing
+            # goes to symbol search and not to whatever input had focus
+            await page.keyboard.press("Escape")
+            await _locator(page, "div[class*='chart-container'] canvas").click(timeout=OPTIONAL_TIMEOUT_MS)
+            await page.keyboard.type(symbol)
+            await page.keyboard.press("Enter")
+            await page.wait_for_function(_TITLE_IS_JS, arg=symbol, timeout=WAIT_TIMEOUT_MS)
+            log.debug("switched chart via symbol search -> %s", symbol)
+            return
+        except Exception as e:
+            log.debug("symbol search failed for %s: %s", symbol, e)
+            await page.keyboard.press("Escape")
+    await page.goto(f"https://www.tradingview.com/chart/?symbol={symbol}",
+                    wait_until="domcontentloaded", timeout=NAV_TIMEOUT_MS)
+    await wait_settled(page, f"chart {symbol}")
+
+def symbol_budget_s(n_tfs: int) -> float:
+    """Seconds one symbol can take if every step in process_symbol hits its timeout."""
+    open_ms  = 3 * WAIT_TIMEOUT_MS + OPTIONAL_TIMEOUT_MS + NAV_TIMEOUT_MS  # open_symbol, all fallbacks
+    apply_ms = 5 * ACTION_TIMEOUT_MS + 2 * OPTIONAL_TIMEOUT_MS + 1000      # apply_template_and_indicator
+    tf_ms    = 6 * ACTION_TIMEOUT_MS + 2 * WAIT_TIMEOUT_MS + 2 * OPTIONAL_TIMEOUT_MS  # switch + create_alert
+    return (open_ms + apply_ms + n_tfs * tf_ms) / 1000
+
+async def process_symbol(page, symbol: str, relay_url: str, tfs: Tuple[str, ...], template_name: str,
+                         existing: FrozenSet[Tuple[str, str]] = frozenset()) -> None:
+    tfs = tuple(tf for tf in tfs if (symbol, TIMEFRAMES[tf]) not in existing)
+    if not tfs:
+        log.info("skipping %s: alerts already exist", symbol)
+        return
+    log.info("processing symbol %s (%s)", symbol, "/".join(tfs))
+    await open_symbol(page, symbol)
     await apply_template_and_indicator(page, template_name)
-    # Replace 15M with 5M when sniper mode is enabled
-    tfs = ["1D", "4H", "1H", "15M"]
-    if sniper:
-        tfs = ["1D", "4H", "1H", "5M"]
     for tf in tfs:
-        print(f"DEBUG: switching timeframe -> {tf}")
+        log.debug("switching timeframe -> %s", tf)
         await safe_click(page, "button[data-name='timeframe']", "timeframe menu")
         await safe_click(page, f"text={tf}", f"timeframe {tf}")
-        await page.wait_for_timeout(1200)
+        await wait_timeframe(page, tf)
         await create_alert(page, relay_url)
 
 async def main(watchlist_name: str) -> None:
-    print(f"DEBUG: Entering main() with watchlist: {watchlist_name}")
+    log.info("Entering main() with watchlist: %s", watchlist_name)
     relay_url  = os.environ.get("RELAY_WEBHOOK_URL")
     secret     = os.environ.get("AUTH_SHARED_SECRET") or os.environ.get("AUTL_SHARED_SECRET")
     template   = os.environ.get("TEMPLATE_NAME")
@@ -177,40 +394,105 @@ async def main(watchlist_name: str) -> None:
 
     # Auto‑tokenize the webhook
     relay_url = _tokenize(relay_url, secret)
-    print(f"DEBUG: relay_url={relay_url}")
-    print(f"DEBUG: template_name={template}")
-    print(f"DEBUG: sniper_mode={sniper}")
-    print(f"DEBUG: headful={'true' if headful else 'false'}")
+    log.debug("relay_url=%s", relay_url)
+    log.info("template_name=%s", template)
+    log.info("sniper_mode=%s", sniper)
+    log.info("headful=%s", "true" if headful else "false")
 
     if not relay_url or not template:
-        print("DEBUG: Missing RELAY_WEBHOOK_URL or TEMPLATE_NAME. Exiting.")
+        log.error("Missing RELAY_WEBHOOK_URL or TEMPLATE_NAME. Exiting.")
         return
 
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=not headful)
-        print("DEBUG: browser launched")
-        context = await browser.new_context()
-        page    = await context.new_page()
+        context = await p.chromium.launch_persistent_context(
+            PROFILE_DIR,
+            headless=not headful,
+            args=CHROMIUM_ARGS,
+            viewport={"width": 1280, "height": 720},
+        )
+        log.debug("browser launched (profile=%s)", PROFILE_DIR)
+        await context.add_init_script(JS_HELPERS)
+        context.set_default_timeout(ACTION_TIMEOUT_MS)  # bounds calls without an explicit timeout
+        page    = context.pages[0] if context.pages else await context.new_page()
         await login(page)
-        print("DEBUG: login() returned")
-        print("DEBUG: IMPORTANT -> Make the target watchlist active in TV before running.")
+        log.debug("login() returned")
+        log.info("IMPORTANT -> Make the target watchlist active in TV before running.")
         symbols = await get_symbols_from_watchlist(page)
         if not symbols:
-            print("DEBUG: No symbols found in active watchlist. Exiting.")
-            await browser.close()
+            log.error("No symbols found in active watchlist. Exiting.")
+            await context.close()
             return
-        for idx, symbol in enumerate(symbols, 1):
-            print(f"DEBUG: [{idx}/{len(symbols)}]")
+        tfs = SNIPER_TFS if sniper else ALERT_TFS
+        existing = await get_existing_alerts(context)
+        # Pool of pages in the same (logged-in) context; each worker takes a
+        # page, processes one symbol and hands it back.
+        concurrency = max(1, int(os.environ.get("WWASD_CONCURRENCY", "4")))
+        pages: asyncio.Queue = asyncio.Queue()
+        pages.put_nowait(page)
+        for _ in range(min(concurrency, len(symbols)) - 1):
+            pages.put_nowait(await context.new_page())
+        live = pages.qsize()
+        log.info("processing with %d page(s)", live)
+
+        budget = symbol_budget_s(len(tfs))
+        symbol_timeout = float(os.environ.get("WWASD_SYMBOL_TIMEOUT") or budget)
+        if symbol_timeout < budget:
+            log.warning("WWASD_SYMBOL_TIMEOUT=%.0fs is below the %.0fs worst case; "
+                        "slow symbols may be cut off mid-way", symbol_timeout, budget)
+
+        async def worker(idx: int, symbol: str) -> None:
+            nonlocal live
+            pg = await pages.get()
+            if pg is None:  # pool exhausted: pass the marker on so other waiters see it too
+                pages.put_nowait(None)
+                log.error("no pages left; skipping %s", symbol)
+                return
             try:
-                await process_symbol(page, symbol, relay_url, sniper, template)
+                log.info("[%d/%d]", idx, len(symbols))
+                await asyncio.wait_for(
+                    process_symbol(pg, symbol, relay_url, tfs, template, existing),
+                    symbol_timeout,
+                )
+            except asyncio.TimeoutError:
+                log.error("TIMEOUT processing %s after %.0fs; replacing its page", symbol, symbol_timeout)
+                _forget_page(pg)
+                try:
+                    await pg.close()
+                except Exception as e:
+                    log.debug("closing timed-out page failed: %s", e)
+                try:
+                    pg = await context.new_page()
+                except Exception as e:
+                    pg = None
+                    live -= 1
+                    log.error("could not replace page (%s); pool down to %d page(s)", e, live)
             except Exception as e:
-                print(f"DEBUG: ERROR while processing {symbol}: {e}")
-        await browser.close()
-        print("DEBUG: done; browser closed")
+                log.error("ERROR while processing %s: %s", symbol, e)
+            finally:
+                if pg is not None:
+                    pages.put_nowait(pg)
+                elif live == 0:
+                    pages.put_nowait(None)
+
+        await asyncio.gather(
+            *(worker(idx, symbol) for idx, symbol in enumerate(symbols, 1)),
+            return_exceptions=True,
+        )
+        await context.close()
+        log.info("done; browser closed")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Set up TradingView alerts for WWASD")
     parser.add_argument("--watchlist", choices=["green", "macro"], required=True,
                         help="Which watchlist to process (make it active in TV first)")
     args = parser.parse_args()
+    logging.basicConfig(level=os.environ.get("WWASD_LOG", "INFO").upper(),
+                        format="%(levelname)s: %(message)s")
+    # uvloop (requirements.txt, non-Windows) speeds up the loop that carries
+    # Playwright's driver traffic; the default loop is used when it is absent.
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main(args.watchlist))